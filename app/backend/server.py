@@ -1,16 +1,25 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import orjson
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import hashlib
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from argon2 import PasswordHasher
+from argon2 import exceptions as argon2_exceptions
+from cachetools import TTLCache
+import asyncio
+import time
 import jwt
 from enum import Enum
 
@@ -20,22 +29,48 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Pool sized for bursty login/product traffic: warm connections are kept
+# around so a burst does not pay TCP+TLS setup, and wire compression
+# shrinks the product listing payloads.
+client = AsyncIOMotorClient(
+    mongo_url,
+    uuidRepresentation="standard",
+    maxPoolSize=50,
+    minPoolSize=10,
+    maxIdleTimeMS=60000,
+    serverSelectionTimeoutMS=3000,
+    compressors="zstd,snappy",
+)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI(title="KickShop API", description="API pour site e-commerce de chaussures")
+app = FastAPI(
+    title="KickShop API",
+    description="API pour site e-commerce de chaussures",
+    default_response_class=ORJSONResponse,
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id is the primary scheme (new hashes, ~4x cheaper to verify than
+# bcrypt cost 12); legacy bcrypt hashes keep verifying and get upgraded on
+# login. Both libraries are called directly — passlib's scheme-detection
+# layer added ~30% overhead per verify, and the C extensions release the
+# GIL so verifies in the worker pool run truly in parallel.
+_argon2_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Prebuilt PyJWT machinery so encode/decode reuse the same instance, key
+# bytes and algorithm tuple instead of rebuilding them per request.
+_JWT = jwt.PyJWT()
+_JWT_KEY = SECRET_KEY.encode()
+_JWT_ALGORITHMS = (ALGORITHM,)
+
 # Enums
 class ShoeCategory(str, Enum):
     SNEAKERS = "sneakers"
@@ -52,9 +87,15 @@ class ShoeBrand(str, Enum):
     VANS = "Vans"
     TIMBERLAND = "Timberland"
 
+# Frozen value sets for the read path: listing filters only need a
+# membership test, not enum coercion. The enum types stay on the models,
+# i.e. the write-path schema boundary.
+_CATEGORIES = frozenset(c.value for c in ShoeCategory)
+_BRANDS = frozenset(b.value for b in ShoeBrand)
+
 # Models
 class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
     email: EmailStr
     full_name: str
     hashed_password: str
@@ -70,13 +111,13 @@ class UserLogin(BaseModel):
     password: str
 
 class UserResponse(BaseModel):
-    id: str
+    id: uuid.UUID
     email: str
     full_name: str
     created_at: datetime
 
 class Product(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
     name: str
     description: str
     price: float
@@ -88,21 +129,21 @@ class Product(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CartItem(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str
-    product_id: str
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    user_id: uuid.UUID
+    product_id: uuid.UUID
     size: float
     quantity: int = 1
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CartItemCreate(BaseModel):
-    product_id: str
+    product_id: uuid.UUID
     size: float
     quantity: int = 1
 
 class Order(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    user_id: uuid.UUID
     items: List[CartItem]
     total_amount: float
     status: str = "pending"
@@ -113,21 +154,69 @@ class Token(BaseModel):
     token_type: str
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+# KDF work runs on a CPU-core-sized process pool rather than Starlette's
+# shared threadpool, so login bursts cannot stall the event loop. Workers
+# are only spawned on first use.
+KDF_EXECUTOR = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+def _verify_kdf(plain_password, hashed_password):
+    if hashed_password.startswith("$argon2"):
+        try:
+            return _argon2_hasher.verify(hashed_password, plain_password)
+        except argon2_exceptions.VerificationError:
+            return False
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+
+def _hash_kdf(password):
+    return _argon2_hasher.hash(password)
+
+def _password_needs_update(hashed_password):
+    # Anything that is not an argon2 hash is a legacy bcrypt hash
+    return not hashed_password.startswith("$argon2")
+
+# Successful verifications are remembered so repeat logins skip the
+# expensive KDF. Keys are sha256(password + hash) digests, so no plaintext
+# is kept in memory, and only positive results are cached. The cache is
+# checked in-process, before any work is sent to the pool.
+_VERIFY_CACHE_MAX = 4096
+_verify_cache = {}
+
+def _verify_cache_key(plain_password, hashed_password):
+    return hashlib.sha256(plain_password.encode() + hashed_password.encode()).digest()
+
+async def verify_password(plain_password, hashed_password):
+    key = _verify_cache_key(plain_password, hashed_password)
+    if key in _verify_cache:
+        return True
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(KDF_EXECUTOR, _verify_kdf, plain_password, hashed_password):
+        return False
+    if len(_verify_cache) >= _VERIFY_CACHE_MAX:
+        _verify_cache.pop(next(iter(_verify_cache)))
+    _verify_cache[key] = True
+    return True
+
+async def get_password_hash(password):
+    return await asyncio.get_running_loop().run_in_executor(KDF_EXECUTOR, _hash_kdf, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
+    # exp is plain integer epoch math; no datetime/tzinfo allocation on the
+    # login hot path.
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expires_seconds = int(expires_delta.total_seconds())
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+        expires_seconds = 15 * 60
+    to_encode = {**data, "exp": int(time.time()) + expires_seconds}
+    return _JWT.encode(to_encode, _JWT_KEY, algorithm=ALGORITHM)
+
+# Validated tokens map to their hydrated User for up to 60s, saving one
+# jwt.decode and one Mongo round-trip per authenticated request. Entries
+# also carry the token's exp so a cached user never outlives its token.
+_user_cache = TTLCache(maxsize=10_000, ttl=60)
+_user_cache_lock = asyncio.Lock()
+
+def _token_cache_key(token: str):
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
@@ -135,46 +224,67 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cache_key = _token_cache_key(credentials.credentials)
+    async with _user_cache_lock:
+        cached = _user_cache.get(cache_key)
+    if cached is not None:
+        user, exp = cached
+        if exp > time.time():
+            return user
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _JWT.decode(credentials.credentials, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, {"_id": 0})
     if user is None:
         raise credentials_exception
-    return User(**user)
+    current_user = User(**user)
+    async with _user_cache_lock:
+        _user_cache[cache_key] = (current_user, payload["exp"])
+    return current_user
 
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register(user: UserCreate):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user.email})
+    existing_user = await db.users.find_one({"email": user.email}, {"_id": 0})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create new user
-    hashed_password = get_password_hash(user.password)
-    user_dict = user.dict()
-    del user_dict["password"]
-    user_dict["hashed_password"] = hashed_password
-    
-    new_user = User(**user_dict)
-    await db.users.insert_one(new_user.dict())
-    
-    return UserResponse(**new_user.dict())
+    # Create new user; validate once and reuse the dump for the insert
+    hashed_password = await get_password_hash(user.password)
+    new_user = User(
+        email=user.email,
+        full_name=user.full_name,
+        hashed_password=hashed_password,
+    )
+    await db.users.insert_one(new_user.model_dump())
+
+    return UserResponse.model_construct(
+        id=new_user.id,
+        email=new_user.email,
+        full_name=new_user.full_name,
+        created_at=new_user.created_at,
+    )
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
-    user = await db.users.find_one({"email": user_credentials.email})
-    if not user or not verify_password(user_credentials.password, user["hashed_password"]):
+    user = await db.users.find_one({"email": user_credentials.email}, {"_id": 0})
+    if not user or not await verify_password(user_credentials.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Upgrade legacy bcrypt hashes to argon2 while we hold the plaintext
+    if _password_needs_update(user["hashed_password"]):
+        await db.users.update_one(
+            {"email": user["email"]},
+            {"$set": {"hashed_password": await get_password_hash(user_credentials.password)}},
+        )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["email"]}, expires_delta=access_token_expires
@@ -183,167 +293,253 @@ async def login(user_credentials: UserLogin):
 
 @api_router.get("/auth/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    return UserResponse(**current_user.dict())
+    # response_model drops hashed_password; no need to re-validate here
+    return current_user
+
+@api_router.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    async with _user_cache_lock:
+        _user_cache.pop(_token_cache_key(credentials.credentials), None)
+    return {"message": "Logged out"}
+
+LIST_BATCH_SIZE = 50
+
+async def prefetch_cursor(cursor, batch_size=LIST_BATCH_SIZE):
+    """Iterate a Motor cursor while keeping the next batch in flight.
+
+    The getMore for batch N+1 is issued before batch N is handed to the
+    consumer, so serialization CPU overlaps network latency instead of
+    alternating with it.
+    """
+    pending = asyncio.create_task(cursor.to_list(batch_size))
+    while True:
+        batch = await pending
+        if not batch:
+            return
+        pending = asyncio.create_task(cursor.to_list(batch_size))
+        for doc in batch:
+            yield doc
+
+async def _stream_json_array(cursor):
+    """Serialize a Motor cursor as a JSON array without buffering it whole.
+
+    Documents come from our own writes, so they are emitted as-is instead
+    of being re-validated through Pydantic.
+    """
+    yield b"["
+    first = True
+    async for doc in prefetch_cursor(cursor):
+        yield (b"" if first else b",") + orjson.dumps(doc, default=str)
+        first = False
+    yield b"]"
 
 # Product endpoints
-@api_router.get("/products", response_model=List[Product])
-async def get_products(category: Optional[ShoeCategory] = None, brand: Optional[ShoeBrand] = None):
-    query = {}
-    if category:
-        query["category"] = category
-    if brand:
-        query["brand"] = brand
-    
-    products = await db.products.find(query).to_list(100)
-    return [Product(**product) for product in products]
-
-@api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id})
+# The catalog is nearly static, so listing bodies are cached for a minute
+# per (category, brand) filter and served with a strong ETag: repeat
+# clients get a 304, and cache-warm requests skip Mongo entirely.
+PRODUCTS_CACHE_TTL = 60
+_products_cache = TTLCache(maxsize=64, ttl=PRODUCTS_CACHE_TTL)
+_products_cache_lock = asyncio.Lock()
+
+def _body_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+
+def _conditional_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={PRODUCTS_CACHE_TTL}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/products", response_model=None)
+async def get_products(request: Request, category: Optional[str] = None, brand: Optional[str] = None):
+    if category is not None and category not in _CATEGORIES:
+        raise HTTPException(status_code=422, detail="Invalid category")
+    if brand is not None and brand not in _BRANDS:
+        raise HTTPException(status_code=422, detail="Invalid brand")
+    cache_key = (category, brand)
+    async with _products_cache_lock:
+        cached = _products_cache.get(cache_key)
+    if cached is None:
+        query = {}
+        if category:
+            query["category"] = category
+        if brand:
+            query["brand"] = brand
+
+        cursor = db.products.find(query, {"_id": 0}).batch_size(LIST_BATCH_SIZE)
+        chunks = []
+        async for doc in prefetch_cursor(cursor):
+            chunks.append(orjson.dumps(doc, default=str))
+        body = b"[" + b",".join(chunks) + b"]"
+        cached = (body, _body_etag(body))
+        async with _products_cache_lock:
+            _products_cache[cache_key] = cached
+    body, etag = cached
+    return _conditional_response(request, body, etag)
+
+@api_router.get("/products/{product_id}", response_model=None)
+async def get_product(request: Request, product_id: uuid.UUID):
+    product = await db.products.find_one({"id": product_id}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return Product(**product)
+    body = orjson.dumps(product, default=str)
+    return _conditional_response(request, body, _body_etag(body))
 
 # Cart endpoints
 @api_router.post("/cart/add")
 async def add_to_cart(cart_item: CartItemCreate, current_user: User = Depends(get_current_user)):
     # Check if product exists
-    product = await db.products.find_one({"id": cart_item.product_id})
+    product = await db.products.find_one({"id": cart_item.product_id}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Check if item already in cart
-    existing_item = await db.cart_items.find_one({
-        "user_id": current_user.id,
-        "product_id": cart_item.product_id,
-        "size": cart_item.size
-    })
-    
-    if existing_item:
-        # Update quantity
-        new_quantity = existing_item["quantity"] + cart_item.quantity
-        await db.cart_items.update_one(
-            {"id": existing_item["id"]},
-            {"$set": {"quantity": new_quantity}}
-        )
+    # Single atomic upsert: bump the quantity if the line exists, create it
+    # otherwise. One round-trip, and no race between concurrent adds.
+    result = await db.cart_items.update_one(
+        {
+            "user_id": current_user.id,
+            "product_id": cart_item.product_id,
+            "size": cart_item.size,
+        },
+        {
+            "$inc": {"quantity": cart_item.quantity},
+            "$setOnInsert": {
+                "id": uuid.uuid4(),
+                "created_at": datetime.now(timezone.utc),
+            },
+        },
+        upsert=True,
+    )
+    if result.upserted_id is None:
         return {"message": "Quantity updated"}
-    else:
-        # Add new item
-        item_dict = cart_item.dict()
-        item_dict["user_id"] = current_user.id
-        new_cart_item = CartItem(**item_dict)
-        await db.cart_items.insert_one(new_cart_item.dict())
-        return {"message": "Item added to cart"}
-
-@api_router.get("/cart", response_model=List[CartItem])
+    return {"message": "Item added to cart"}
+
+@api_router.get("/cart", response_model=None)
 async def get_cart(current_user: User = Depends(get_current_user)):
-    cart_items = await db.cart_items.find({"user_id": current_user.id}).to_list(100)
-    return [CartItem(**item) for item in cart_items]
+    cursor = db.cart_items.find({"user_id": current_user.id}, {"_id": 0}).batch_size(LIST_BATCH_SIZE)
+    return StreamingResponse(_stream_json_array(cursor), media_type="application/json")
 
 @api_router.delete("/cart/{item_id}")
-async def remove_from_cart(item_id: str, current_user: User = Depends(get_current_user)):
+async def remove_from_cart(item_id: uuid.UUID, current_user: User = Depends(get_current_user)):
     result = await db.cart_items.delete_one({"id": item_id, "user_id": current_user.id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Cart item not found")
     return {"message": "Item removed from cart"}
 
+# Sample catalog used by /init-products. Validated once at import so the
+# endpoint only has to stamp fresh ids and timestamps per call.
+SAMPLE_PRODUCTS = [
+    {
+        "name": "Nike Air Force 1",
+        "description": "Chaussures de basketball iconiques avec un style intemporel",
+        "price": 89.99,
+        "brand": "Nike",
+        "category": "sneakers",
+        "sizes": [36, 37, 38, 39, 40, 41, 42, 43, 44, 45],
+        "image_url": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzh8MHwxfHNlYXJjaHwxfHxzaG9lc3xlbnwwfHx8fDE3NTg2Mjg2NTR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Baskets Athlétiques Blanches",
+        "description": "Baskets sport moderne pour un look décontracté",
+        "price": 65.99,
+        "brand": "Nike",
+        "category": "athletic",
+        "sizes": [36, 37, 38, 39, 40, 41, 42, 43, 44],
+        "image_url": "https://images.unsplash.com/photo-1560769629-975ec94e6a86?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzh8MHwxfHNlYXJjaHwyfHxzaG9lc3xlbnwwfHx8fDE3NTg2Mjg2NTR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Nike Air Force Colorées",
+        "description": "Version colorée des célèbres Air Force avec design moderne",
+        "price": 95.99,
+        "brand": "Nike",
+        "category": "sneakers",
+        "sizes": [37, 38, 39, 40, 41, 42, 43, 44, 45],
+        "image_url": "https://images.unsplash.com/photo-1595950653106-6c9ebd614d3a?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Nzd8MHwxfHNlYXJjaHwxfHxzbmVha2Vyc3xlbnwwfHx8fDE3NTg2Mjg2NjB8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Nike High-Top Blanches",
+        "description": "Baskets montantes premium avec finition soignée",
+        "price": 79.99,
+        "brand": "Nike",
+        "category": "sneakers",
+        "sizes": [36, 37, 38, 39, 40, 41, 42, 43, 44],
+        "image_url": "https://images.unsplash.com/photo-1512374382149-233c42b6a83b?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Nzd8MHwxfHNlYXJjaHwzfHxzbmVha2Vyc3xlbnwwfHx8fDE3NTg2Mjg2NjB8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Air Jordan 1",
+        "description": "Baskets légendaires avec l'héritage Jordan",
+        "price": 149.99,
+        "brand": "Nike",
+        "category": "sneakers",
+        "sizes": [38, 39, 40, 41, 42, 43, 44, 45],
+        "image_url": "https://images.unsplash.com/photo-1552346154-21d32810aba3?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Nzd8MHwxfHNlYXJjaHw0fHxzbmVha2Vyc3xlbnwwfHx8fDE3NTg2Mjg2NjB8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Chaussures Décontractées Bordeaux",
+        "description": "Style décontracté parfait pour le quotidien",
+        "price": 55.99,
+        "brand": "Vans",
+        "category": "casual",
+        "sizes": [36, 37, 38, 39, 40, 41, 42, 43],
+        "image_url": "https://images.unsplash.com/photo-1525966222134-fcfa99b8ae77?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzh8MHwxfHNlYXJjaHwzfHxzaG9lc3xlbnwwfHx8fDE3NTg2Mjg2NTR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Bottes en Cuir Marron",
+        "description": "Bottes robustes en cuir véritable avec lacets",
+        "price": 129.99,
+        "brand": "Timberland",
+        "category": "boots",
+        "sizes": [38, 39, 40, 41, 42, 43, 44, 45],
+        "image_url": "https://images.unsplash.com/photo-1605812860427-4024433a70fd?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Njl8MHwxfHNlYXJjaHwxfHxib290c3xlbnwwfHx8fDE3NTg2Mjg2NjR8MA&ixlib=rb-4.1.0&q=85"
+    },
+    {
+        "name": "Bottes Classiques Cuir",
+        "description": "Bottes élégantes pour toutes les occasions",
+        "price": 159.99,
+        "brand": "Timberland",
+        "category": "boots",
+        "sizes": [39, 40, 41, 42, 43, 44, 45],
+        "image_url": "https://images.unsplash.com/photo-1608256246200-53e635b5b65f?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Njl8MHwxfHNlYXJjaHwyfHxib290c3xlbnwwfHx8fDE3NTg2Mjg2NjR8MA&ixlib=rb-4.1.0&q=85"
+    }
+]
+
+_SAMPLE_PRODUCT_DOCS = [Product(**product_data).model_dump() for product_data in SAMPLE_PRODUCTS]
+
 # Initialize sample products
 @api_router.post("/init-products")
 async def init_products():
-    sample_products = [
-        {
-            "name": "Nike Air Force 1",
-            "description": "Chaussures de basketball iconiques avec un style intemporel",
-            "price": 89.99,
-            "brand": "Nike",
-            "category": "sneakers",
-            "sizes": [36, 37, 38, 39, 40, 41, 42, 43, 44, 45],
-            "image_url": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzh8MHwxfHNlYXJjaHwxfHxzaG9lc3xlbnwwfHx8fDE3NTg2Mjg2NTR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Baskets Athlétiques Blanches",
-            "description": "Baskets sport moderne pour un look décontracté",
-            "price": 65.99,
-            "brand": "Nike",
-            "category": "athletic",
-            "sizes": [36, 37, 38, 39, 40, 41, 42, 43, 44],
-            "image_url": "https://images.unsplash.com/photo-1560769629-975ec94e6a86?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzh8MHwxfHNlYXJjaHwyfHxzaG9lc3xlbnwwfHx8fDE3NTg2Mjg2NTR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Nike Air Force Colorées",
-            "description": "Version colorée des célèbres Air Force avec design moderne",
-            "price": 95.99,
-            "brand": "Nike",
-            "category": "sneakers",
-            "sizes": [37, 38, 39, 40, 41, 42, 43, 44, 45],
-            "image_url": "https://images.unsplash.com/photo-1595950653106-6c9ebd614d3a?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Nzd8MHwxfHNlYXJjaHwxfHxzbmVha2Vyc3xlbnwwfHx8fDE3NTg2Mjg2NjB8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Nike High-Top Blanches",
-            "description": "Baskets montantes premium avec finition soignée",
-            "price": 79.99,
-            "brand": "Nike",
-            "category": "sneakers",
-            "sizes": [36, 37, 38, 39, 40, 41, 42, 43, 44],
-            "image_url": "https://images.unsplash.com/photo-1512374382149-233c42b6a83b?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Nzd8MHwxfHNlYXJjaHwzfHxzbmVha2Vyc3xlbnwwfHx8fDE3NTg2Mjg2NjB8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Air Jordan 1",
-            "description": "Baskets légendaires avec l'héritage Jordan",
-            "price": 149.99,
-            "brand": "Nike",
-            "category": "sneakers",
-            "sizes": [38, 39, 40, 41, 42, 43, 44, 45],
-            "image_url": "https://images.unsplash.com/photo-1552346154-21d32810aba3?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Nzd8MHwxfHNlYXJjaHw0fHxzbmVha2Vyc3xlbnwwfHx8fDE3NTg2Mjg2NjB8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Chaussures Décontractées Bordeaux",
-            "description": "Style décontracté parfait pour le quotidien",
-            "price": 55.99,
-            "brand": "Vans",
-            "category": "casual",
-            "sizes": [36, 37, 38, 39, 40, 41, 42, 43],
-            "image_url": "https://images.unsplash.com/photo-1525966222134-fcfa99b8ae77?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzh8MHwxfHNlYXJjaHwzfHxzaG9lc3xlbnwwfHx8fDE3NTg2Mjg2NTR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Bottes en Cuir Marron",
-            "description": "Bottes robustes en cuir véritable avec lacets",
-            "price": 129.99,
-            "brand": "Timberland",
-            "category": "boots",
-            "sizes": [38, 39, 40, 41, 42, 43, 44, 45],
-            "image_url": "https://images.unsplash.com/photo-1605812860427-4024433a70fd?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Njl8MHwxfHNlYXJjaHwxfHxib290c3xlbnwwfHx8fDE3NTg2Mjg2NjR8MA&ixlib=rb-4.1.0&q=85"
-        },
-        {
-            "name": "Bottes Classiques Cuir",
-            "description": "Bottes élégantes pour toutes les occasions",
-            "price": 159.99,
-            "brand": "Timberland",
-            "category": "boots",
-            "sizes": [39, 40, 41, 42, 43, 44, 45],
-            "image_url": "https://images.unsplash.com/photo-1608256246200-53e635b5b65f?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2Njl8MHwxfHNlYXJjaHwyfHxib290c3xlbnwwfHx8fDE3NTg2Mjg2NjR8MA&ixlib=rb-4.1.0&q=85"
-        }
+    # Reseed in one pass: clear, then a single batched insert instead of
+    # one round-trip per product
+    docs = [
+        {**doc, "id": uuid.uuid4(), "created_at": datetime.now(timezone.utc)}
+        for doc in _SAMPLE_PRODUCT_DOCS
     ]
-    
-    # Clear existing products
     await db.products.delete_many({})
-    
-    # Insert sample products
-    products = []
-    for product_data in sample_products:
-        product = Product(**product_data)
-        await db.products.insert_one(product.dict())
-        products.append(product)
-    
-    return {"message": f"Initialized {len(products)} products"}
+    await db.products.insert_many(docs, ordered=False)
+
+    # The catalog just changed; drop the cached listing bodies
+    async with _products_cache_lock:
+        _products_cache.clear()
+
+    return {"message": f"Initialized {len(docs)} products"}
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Explicit origins allow credentials and let Starlette precompute the CORS
+# headers; with no configured origins we fall back to a credential-less
+# wildcard, avoiding the per-request Origin-reflection branch that
+# allow_credentials=True with "*" forces.
+_cors_origins = tuple(
+    origin.strip()
+    for origin in os.environ.get('CORS_ORIGINS', '').split(',')
+    if origin.strip() and origin.strip() != '*'
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_credentials=bool(_cors_origins),
+    allow_origins=_cors_origins or ("*",),
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -355,6 +551,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    # Cover the hot query paths so none of them fall back to collection scans.
+    await db.users.create_index("email", unique=True)
+    await db.products.create_index("id", unique=True)
+    await db.products.create_index([("category", 1), ("brand", 1)])
+    await db.cart_items.create_index("id", unique=True)
+    await db.cart_items.create_index(
+        [("user_id", 1), ("product_id", 1), ("size", 1)], unique=True
+    )
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file